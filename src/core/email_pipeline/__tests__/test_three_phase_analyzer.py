@@ -0,0 +1,78 @@
+"""
+Tests for ThreePhaseEmailAnalyzer batch saving.
+"""
+
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import three_phase_analyzer  # noqa: E402
+from three_phase_analyzer import ThreePhaseEmailAnalyzer  # noqa: E402
+
+
+def _create_analysis_table(db_path: Path) -> None:
+    """Create an email_analysis table with the columns the analyzer inserts."""
+    columns = re.search(r"\((.*?)\)", three_phase_analyzer.INSERT_ANALYSIS_SQL, re.S).group(1)
+    definitions = []
+    for column in (name.strip() for name in columns.split(",")):
+        if column == "id":
+            definitions.append("id TEXT PRIMARY KEY")
+        elif column == "email_id":
+            definitions.append("email_id TEXT NOT NULL")
+        else:
+            definitions.append(column)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE email_analysis ({', '.join(definitions)})")
+    conn.commit()
+    conn.close()
+
+
+def _make_batch(analyzer: ThreePhaseEmailAnalyzer, batch_dir: Path, name: str,
+                email_ids: list) -> tuple:
+    """Write a placeholder batch file and return its queued (path, rows, start) item."""
+    batch_file = batch_dir / name
+    batch_file.write_text("[]")
+    rows = [
+        analyzer.analyze_email(
+            {"id": email_id, "subject": f"Quote #{1000 + i}", "body": "Please send pricing."},
+            "2024-01-01T00:00:00"
+        )
+        for i, email_id in enumerate(email_ids)
+    ]
+    return str(batch_file), rows, time.perf_counter()
+
+
+def test_bad_batch_does_not_block_coalesced_batches(tmp_path):
+    db_path = tmp_path / "crewai.db"
+    _create_analysis_table(db_path)
+    batch_dir = tmp_path / "batches"
+    batch_dir.mkdir()
+
+    analyzer = ThreePhaseEmailAnalyzer(workers=1)
+    analyzer.crewai_db_path = str(db_path)
+    analyzer.processed_dir = tmp_path / "processed"
+    analyzer.processed_dir.mkdir()
+
+    batches = [
+        _make_batch(analyzer, batch_dir, "b1.json", ["b1-1", "b1-2"]),
+        # A list-valued id cannot be bound, so this batch's insert fails
+        _make_batch(analyzer, batch_dir, "b2.json", ["b2-1", ["b2-2"]]),
+        _make_batch(analyzer, batch_dir, "b3.json", ["b3-1"]),
+    ]
+    try:
+        saved = analyzer._save_batch_group(batches)
+    finally:
+        analyzer.close()
+
+    assert saved == 2
+    assert sorted(p.name for p in analyzer.processed_dir.iterdir()) == ["b1.json", "b3.json"]
+    assert [p.name for p in batch_dir.iterdir()] == ["b2.json"]
+
+    conn = sqlite3.connect(db_path)
+    email_ids = sorted(row[0] for row in conn.execute("SELECT email_id FROM email_analysis"))
+    conn.close()
+    assert email_ids == ["b1-1", "b1-2", "b3-1"]
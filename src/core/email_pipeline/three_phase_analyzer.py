@@ -9,17 +9,27 @@ This module implements a three-phase analysis system for processing email batche
 Results are saved to the CrewAI database email_analysis table.
 """
 
+import functools
 import json
 import logging
+import multiprocessing
+import multiprocessing.pool
 import os
+import queue
 import re
 import shutil
 import sqlite3
+import threading
 import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -28,13 +38,228 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# SQLite tuning applied to every connection: WAL with synchronous=NORMAL avoids
+# the double fsync per commit while still surviving a process crash, and the
+# larger page cache / mmap window keep the working set in memory during loads.
+# journal_size_limit truncates the WAL back to 64 MB after checkpoints so long
+# runs do not leave a multi-GB -wal file behind.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA cache_size=-262144;"
+    "PRAGMA mmap_size=268435456;"
+    "PRAGMA journal_size_limit=67108864;"
+)
+
+# Emails per worker task when the phases run in a process pool; batches no
+# larger than one chunk are analysed in-process
+ANALYSIS_CHUNK_SIZE = 500
+
+# Analysed batches allowed to wait for the writer thread before parsing blocks
+WRITE_QUEUE_SIZE = 4
+
+# The writer thread folds queued batches into one transaction until this many
+# rows are pending, so runs of small batch files share a single commit
+WRITE_FLUSH_ROWS = 5000
+
+# Stay under SQLite's default host-parameter limit for IN (...) lookups
+SQLITE_MAX_PARAMS = 900
+
+# Insert statement for the email_analysis table; a single constant string keeps
+# sqlite3's per-connection statement cache hitting on every batch. Only a
+# primary-key conflict (an already analysed email) is skipped, so NOT NULL and
+# other constraint violations still fail the batch.
+INSERT_ANALYSIS_SQL = """
+    INSERT INTO email_analysis (
+        id, email_id, 
+        quick_workflow, quick_priority, quick_intent, quick_urgency, 
+        quick_confidence, quick_suggested_state, quick_model, quick_processing_time,
+        deep_workflow_primary, deep_workflow_secondary, deep_workflow_related, deep_confidence,
+        entities_po_numbers, entities_quote_numbers, entities_case_numbers, 
+        entities_part_numbers, entities_order_references, entities_contacts,
+        action_items, workflow_state, business_impact, contextual_summary, 
+        suggested_response, related_emails,
+        deep_processing_time, total_processing_time,
+        quality_score, final_confidence, needs_review,
+        created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO NOTHING
+"""
+
+# Existing-analysis lookup, formatted per chunk size by _select_analyzed_sql
+SELECT_ANALYZED_IDS_SQL = "SELECT email_id FROM email_analysis WHERE email_id IN ({placeholders})"
+
+# Namespace for analysis ids derived from the email id, so re-analysing the
+# same email always yields the same primary key
+ANALYSIS_ID_NAMESPACE = uuid.UUID("5b0c2f4e-7d1a-4c3b-9a56-0e8f3d2c1b7a")
+
+# Response SLA for action items by email priority; anything else gets the Low SLA
+PRIORITY_SLA = {
+    "Critical": "4 hours",
+    "High": "1 business day",
+    "Medium": "3 business days"
+}
+DEFAULT_SLA = "5 business days"
+
+# Serialized empty list; most entity/action columns are empty, so skip json.dumps
+EMPTY_JSON_LIST = '[]'
+
+# Batch files can be large; orjson parses them several times faster than json
+if orjson is not None:
+    def _json_loads(data: bytes) -> Any:
+        """Parse JSON with orjson, falling back to json for input it rejects."""
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson refuses lone UTF-16 surrogate escapes such as \ud83d, which
+            # exporters emit when truncating inside an emoji; json accepts them
+            return json.loads(data)
+else:
+    _json_loads = json.loads
+
+if orjson is not None:
+    def _json_dumps(value: Any) -> str:
+        """Serialize a JSON column with orjson, falling back to json."""
+        try:
+            return orjson.dumps(value).decode()
+        except orjson.JSONEncodeError:
+            # Text parsed via the json fallback may hold lone surrogates,
+            # which orjson cannot encode; json escapes them
+            return json.dumps(value)
+else:
+    _json_dumps = json.dumps
+
+# Entity extraction patterns, compiled once and shared by every email
+ENTITY_PATTERNS = {
+    # PO Numbers (various formats)
+    'po_numbers': [
+        re.compile(r'PO\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'Purchase\s*Order\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'P\.O\.\s*(\d{4,})', re.I)
+    ],
+    # Quote Numbers
+    'quote_numbers': [
+        re.compile(r'Quote\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'Quotation\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'RFQ\s*#?\s*(\d{4,})', re.I)
+    ],
+    # Case Numbers
+    'case_numbers': [
+        re.compile(r'Case\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'Ticket\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'SR\s*#?\s*(\d{4,})', re.I)
+    ],
+    # Part Numbers (alphanumeric)
+    'part_numbers': [
+        re.compile(r'Part\s*#?\s*([A-Z0-9]{4,})', re.I),
+        re.compile(r'SKU\s*:?\s*([A-Z0-9]{4,})', re.I),
+        re.compile(r'Item\s*#?\s*([A-Z0-9]{4,})', re.I)
+    ],
+    # Order References
+    'order_references': [
+        re.compile(r'Order\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'Ref\s*#?\s*(\d{4,})', re.I),
+        re.compile(r'Reference\s*:?\s*(\d{4,})', re.I)
+    ]
+}
+EMAIL_ADDRESS_PATTERN = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+PHONE_PATTERN = re.compile(r'(?:\+?1[-.]?)?\(?(\d{3})\)?[-.]?(\d{3})[-.]?(\d{4})')
+
+# Action item patterns
+ACTION_PATTERNS = [
+    re.compile(r'please\s+(.+?)(?:\.|$)', re.I | re.MULTILINE),
+    re.compile(r'need\s+(?:you\s+)?to\s+(.+?)(?:\.|$)', re.I | re.MULTILINE),
+    re.compile(r'could\s+you\s+(.+?)(?:\.|$)', re.I | re.MULTILINE),
+    re.compile(r'can\s+you\s+(.+?)(?:\.|$)', re.I | re.MULTILINE),
+    re.compile(r'(?:we|I)\s+need\s+(.+?)(?:\.|$)', re.I | re.MULTILINE),
+    re.compile(r'action\s*required\s*:?\s*(.+?)(?:\.|$)', re.I | re.MULTILINE)
+]
+
+
+def _dumps_list(values: List) -> str:
+    """Serialize a list column, reusing the constant for the common empty case."""
+    return _json_dumps(values) if values else EMPTY_JSON_LIST
+
+
+class EmailText(NamedTuple):
+    """Subject/body strings of one email, derived once and shared by all phases."""
+    subject: str
+    body: str
+    full_text: str
+    subject_lower: str
+    body_lower: str
+    full_text_lower: str
+
+
+def _email_text(email: Dict) -> EmailText:
+    """Build the original and lowercased text views of an email."""
+    subject = email.get('subject', '')
+    body = email.get('body', '')
+    subject_lower = subject.lower()
+    body_lower = body.lower()
+    return EmailText(
+        subject=subject,
+        body=body,
+        full_text=f"{subject} {body}",
+        subject_lower=subject_lower,
+        body_lower=body_lower,
+        full_text_lower=f"{subject_lower} {body_lower}"
+    )
+
+
+def _read_batch_file(path: str) -> bytes:
+    """
+    Read a batch file in one pass.
+    
+    Where supported, hint sequential access to the kernel and drop the file
+    from the page cache afterwards so it does not evict SQLite pages.
+    """
+    fadvise = getattr(os, 'posix_fadvise', None)
+    with open(path, 'rb') as f:
+        if fadvise:
+            fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        data = f.read()
+        if fadvise:
+            fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return data
+
+
+@functools.lru_cache(maxsize=None)
+def _select_analyzed_sql(count: int) -> str:
+    """Build (once per size) the IN (...) lookup for `count` email ids."""
+    return SELECT_ANALYZED_IDS_SQL.format(placeholders=",".join("?" * count))
+
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Fuse literal keywords into one alternation so the text is scanned once."""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+# Literal keyword groups matched against lowercased email text
+URGENCY_KEYWORDS = _keyword_pattern(["urgent", "asap", "immediate", "critical", "emergency"])
+RESOLVED_KEYWORDS = _keyword_pattern(["resolved", "closed", "completed"])
+RESOLUTION_STATE_KEYWORDS = _keyword_pattern(["resolved", "closed", "completed", "done"])
+PENDING_STATE_KEYWORDS = _keyword_pattern(["waiting", "pending", "hold"])
+
+
+def _compile_patterns(patterns: Dict[str, List[str]]) -> Dict[str, List[re.Pattern]]:
+    """Compile a mapping of label -> regex strings into case-insensitive patterns."""
+    return {
+        label: [re.compile(pattern, re.I) for pattern in label_patterns]
+        for label, label_patterns in patterns.items()
+    }
+
 
 class ThreePhaseEmailAnalyzer:
     """
     Analyzes email batches through three phases and saves results to CrewAI database.
     """
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
+        # Worker processes for the CPU-bound analysis phases (default: all cores)
+        self.workers = workers or os.cpu_count() or 1
+        
         self.batch_dir = Path("/home/pricepro2006/CrewAI_Team/test-email-batches")
         self.processed_dir = Path("/home/pricepro2006/CrewAI_Team/processed-test-email-batches")
         self.crewai_db_path = "/home/pricepro2006/CrewAI_Team/crewai.db"
@@ -110,6 +335,71 @@ class ThreePhaseEmailAnalyzer:
             "NEW", "IN_PROGRESS", "PENDING_RESPONSE", "ESCALATED",
             "ON_HOLD", "RESOLVED", "CLOSED"
         ]
+        
+        # Compiled forms of the classification patterns above
+        self._workflow_regexes = _compile_patterns(self.workflow_patterns)
+        self._priority_regexes = _compile_patterns(self.priority_indicators)
+        self._intent_regexes = _compile_patterns(self.intent_patterns)
+        
+        # Set once the email_analysis indexes have been created
+        self._indexes_ready = False
+        
+        # Database connections, opened on first use and closed by close(). WAL
+        # lets the reader look up existing analyses while the writer commits.
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Open a connection to the CrewAI database with tuned pragmas."""
+        conn = sqlite3.connect(self.crewai_db_path, check_same_thread=False)
+        conn.executescript(SQLITE_PRAGMAS)
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return the read-only lookup connection, opening it on first use."""
+        if self._read_conn is None:
+            self._read_conn = self._connect(read_only=True)
+        return self._read_conn
+
+    def _writer(self) -> sqlite3.Connection:
+        """Return the single write connection, opening it on first use."""
+        if self._write_conn is None:
+            self._write_conn = self._connect()
+            # Index before the first _filter_unanalyzed lookup, not the first insert
+            self._ensure_indexes(self._write_conn)
+        return self._write_conn
+
+    def close(self) -> None:
+        """Close the database connections."""
+        if self._read_conn is not None:
+            self._read_conn.close()
+            self._read_conn = None
+        with self._write_lock:
+            if self._write_conn is None:
+                return
+            # Refresh planner statistics when SQLite deems it worthwhile
+            try:
+                self._write_conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            self._write_conn.close()
+            self._write_conn = None
+
+    def _ensure_indexes(self, conn: sqlite3.Connection) -> None:
+        """Create the email_analysis lookup index once per analyzer."""
+        if self._indexes_ready:
+            return
+        try:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_email_analysis_email_id "
+                "ON email_analysis(email_id)"
+            )
+            self._indexes_ready = True
+        except sqlite3.Error as e:
+            logger.warning(f"Could not create email_analysis indexes: {e}")
 
     def process_batch_file(self, batch_file_path: str) -> bool:
         """
@@ -121,14 +411,109 @@ class ThreePhaseEmailAnalyzer:
         Returns:
             bool: True if processing successful, False otherwise
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
+        
+        with self._write_lock:
+            self._writer()
         
+        analysis_results = self._analyze_batch_file(batch_file_path)
+        if analysis_results is None:
+            return False
+        
+        return self._save_batch_results(batch_file_path, analysis_results, start_time)
+
+    def process_batch_files(self, batch_files: List[str]) -> int:
+        """
+        Process several batch files, overlapping analysis with database writes.
+        
+        A writer thread owns all SQLite writes and batch-file moves, so the next
+        file is parsed and analysed while the previous one is being committed.
+        Batches large enough for the process pool share one pool for the run.
+        
+        Args:
+            batch_files: Paths to the batch JSON files
+            
+        Returns:
+            int: Number of batch files processed successfully
+        """
+        with self._write_lock:
+            self._writer()
+        
+        write_queue: "queue.Queue[Optional[Tuple[str, List[Dict], float]]]" = queue.Queue(
+            maxsize=WRITE_QUEUE_SIZE
+        )
+        success_count = 0
+        
+        def writer() -> None:
+            nonlocal success_count
+            done = False
+            while not done:
+                item = write_queue.get()
+                if item is None:
+                    break
+                pending = [item]
+                pending_rows = len(item[1])
+                # Coalesce whatever else is already queued; an empty queue
+                # means analysis is behind, so flush rather than wait
+                while pending_rows < WRITE_FLUSH_ROWS:
+                    try:
+                        item = write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    pending.append(item)
+                    pending_rows += len(item[1])
+                success_count += self._save_batch_group(pending)
+        
+        pool = None
+        
+        def get_pool() -> multiprocessing.pool.Pool:
+            # Started on the first batch that needs it, then reused by the rest
+            nonlocal pool
+            if pool is None:
+                pool = self._create_pool(self.workers)
+            return pool
+        
+        writer_thread = threading.Thread(target=writer, name="email-analysis-writer")
+        writer_thread.start()
+        try:
+            for batch_file_path in batch_files:
+                start_time = time.perf_counter()
+                analysis_results = self._analyze_batch_file(batch_file_path, get_pool)
+                if analysis_results is not None:
+                    write_queue.put((batch_file_path, analysis_results, start_time))
+        finally:
+            write_queue.put(None)
+            writer_thread.join()
+            if pool is not None:
+                pool.close()
+                pool.join()
+        
+        return success_count
+
+    def _analyze_batch_file(
+        self,
+        batch_file_path: str,
+        get_pool: Optional[Callable[[], multiprocessing.pool.Pool]] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Load a batch file and run every email through the three phases.
+        
+        Args:
+            batch_file_path: Path to the batch JSON file
+            get_pool: Returns a shared worker pool; without it a pool is
+                started for this batch only
+            
+        Returns:
+            List of analysis rows, or None if the batch could not be analysed
+        """
         try:
             logger.info(f"Processing batch file: {batch_file_path}")
             
             # Load batch data
-            with open(batch_file_path, 'r', encoding='utf-8') as f:
-                batch_data = json.load(f)
+            batch_data = _json_loads(_read_batch_file(batch_file_path))
             
             # Handle both formats: array directly or object with 'emails' key
             if isinstance(batch_data, list):
@@ -137,82 +522,203 @@ class ThreePhaseEmailAnalyzer:
                 emails = batch_data.get('emails', [])
             if not emails:
                 logger.warning(f"No emails found in batch: {batch_file_path}")
-                return False
+                return None
+            
+            # Skip emails that already have an analysis row
+            emails = self._filter_unanalyzed(emails)
             
             logger.info(f"Processing {len(emails)} emails from batch")
             
-            # Process each email through all phases
-            analysis_results = []
+            # One timestamp for the whole batch instead of a clock call per email
+            timestamp = datetime.utcnow().isoformat()
             
-            for email in emails:
-                email_start_time = time.time()
-                
-                # Phase 1: Quick Classification
-                phase1_results = self.analyze_batch_phase1(email)
-                
-                # Phase 2: Deep Analysis
-                phase2_results = self.analyze_batch_phase2(email, phase1_results)
-                
-                # Phase 3: Final Enrichment
-                phase3_results = self.analyze_batch_phase3(email, phase1_results, phase2_results)
-                
-                # Combine all results
-                total_time = time.time() - email_start_time
-                
-                analysis_result = {
-                    'id': str(uuid.uuid4()),
-                    'email_id': email.get('id', str(uuid.uuid4())),
-                    **phase1_results,
-                    **phase2_results,
-                    **phase3_results,
-                    'total_processing_time': round(total_time, 3),
-                    'created_at': datetime.utcnow().isoformat(),
-                    'updated_at': datetime.utcnow().isoformat()
-                }
-                
-                analysis_results.append(analysis_result)
+            # Process each email through all phases
+            return self._analyze_emails(emails, timestamp, get_pool)
             
+        except Exception as e:
+            logger.error(f"Error processing batch file: {e}", exc_info=True)
+            return None
+
+    def _save_batch_results(self, batch_file_path: str, analysis_results: List[Dict],
+                            start_time: float) -> bool:
+        """Save a batch's analysis rows and move the batch file to processed_dir."""
+        return self._save_batch_group([(batch_file_path, analysis_results, start_time)]) == 1
+
+    def _save_batch_group(self, batches: List[Tuple[str, List[Dict], float]]) -> int:
+        """
+        Save the analysis rows of several batches in one transaction, then move
+        each batch file to processed_dir.
+        
+        If the combined write fails, each batch is retried on its own so one
+        bad batch does not hold back the others in its group.
+        
+        Returns:
+            int: Number of batch files saved and moved
+        """
+        try:
             # Save all results to database
-            success = self.save_to_crewai_database(analysis_results)
-            
-            if success:
+            rows = [row for _, analysis_results, _ in batches for row in analysis_results]
+            success = self.save_to_crewai_database(rows)
+        except Exception as e:
+            logger.error(f"Error processing batch file: {e}", exc_info=True)
+            success = False
+        
+        if not success:
+            if len(batches) > 1:
+                logger.warning(
+                    f"Saving {len(batches)} coalesced batches one at a time "
+                    f"after a failed write"
+                )
+                return sum(self._save_batch_results(*batch) for batch in batches)
+            logger.error(f"Failed to save results to database for batch file: {batches[0][0]}")
+            return 0
+        
+        moved = 0
+        for batch_file_path, _, start_time in batches:
+            try:
                 # Move batch file to processed directory
                 batch_filename = os.path.basename(batch_file_path)
                 processed_path = self.processed_dir / batch_filename
                 shutil.move(batch_file_path, processed_path)
                 logger.info(f"Moved batch file to: {processed_path}")
                 
-                total_time = time.time() - start_time
+                total_time = time.perf_counter() - start_time
                 logger.info(f"Successfully processed batch in {total_time:.2f} seconds")
-                return True
-            else:
-                logger.error("Failed to save results to database")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error processing batch file: {e}", exc_info=True)
-            return False
+                moved += 1
+            except Exception as e:
+                logger.error(f"Error processing batch file: {e}", exc_info=True)
+        
+        return moved
 
-    def analyze_batch_phase1(self, email: Dict) -> Dict:
+    def _filter_unanalyzed(self, emails: List[Dict]) -> List[Dict]:
+        """
+        Drop emails whose id already appears in email_analysis.
+        
+        Looks ids up in chunked IN (...) queries rather than one query per email.
+        """
+        email_ids = [email['id'] for email in emails if email.get('id')]
+        if not email_ids:
+            return emails
+        
+        analyzed = set()
+        try:
+            conn = self._reader()
+            for i in range(0, len(email_ids), SQLITE_MAX_PARAMS):
+                chunk = email_ids[i:i + SQLITE_MAX_PARAMS]
+                cursor = conn.execute(_select_analyzed_sql(len(chunk)), chunk)
+                analyzed.update(row[0] for row in cursor)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not check for existing analyses: {e}")
+            return emails
+        
+        if analyzed:
+            logger.info(f"Skipping {len(analyzed)} emails that were already analyzed")
+        return [email for email in emails if email.get('id') not in analyzed]
+
+    def _analyze_emails(
+        self,
+        emails: List[Dict],
+        timestamp: str,
+        get_pool: Optional[Callable[[], multiprocessing.pool.Pool]] = None
+    ) -> List[Dict]:
+        """
+        Run all three phases over a batch, fanning out to worker processes.
+        
+        The phases are pure CPU work, so large batches are split into chunks and
+        analysed in a multiprocessing pool; results keep the input order. The
+        pool comes from get_pool when given, otherwise one is started and shut
+        down for this batch.
+        """
+        if self.workers <= 1 or len(emails) <= ANALYSIS_CHUNK_SIZE:
+            return [self.analyze_email(email, timestamp) for email in emails]
+        
+        chunks = [
+            (emails[i:i + ANALYSIS_CHUNK_SIZE], timestamp)
+            for i in range(0, len(emails), ANALYSIS_CHUNK_SIZE)
+        ]
+        if get_pool is not None:
+            return self._analyze_chunks(get_pool(), chunks)
+        with self._create_pool(min(self.workers, len(chunks))) as pool:
+            return self._analyze_chunks(pool, chunks)
+
+    @staticmethod
+    def _create_pool(processes: int) -> multiprocessing.pool.Pool:
+        """Start a pool of analysis workers, each with its own analyzer."""
+        # spawn rather than fork: batches may be analysed while the writer
+        # thread from process_batch_files holds locks in this process
+        context = multiprocessing.get_context("spawn")
+        return context.Pool(processes, initializer=_init_worker)
+
+    @staticmethod
+    def _analyze_chunks(pool: multiprocessing.pool.Pool,
+                        chunks: List[Tuple[List[Dict], str]]) -> List[Dict]:
+        """Analyse chunks in the pool, keeping the input order."""
+        analysis_results = []
+        for chunk_results in pool.imap(_analyze_chunk, chunks):
+            analysis_results.extend(chunk_results)
+        return analysis_results
+
+    def analyze_email(self, email: Dict, timestamp: str) -> Dict:
+        """
+        Process a single email through all three phases.
+        
+        Args:
+            email: Email data dictionary
+            timestamp: ISO timestamp used for created_at/updated_at
+            
+        Returns:
+            Dict with the combined analysis row
+        """
+        email_start_time = time.perf_counter()
+        text = _email_text(email)
+        
+        # Phase 1: Quick Classification
+        phase1_results = self.analyze_batch_phase1(email, text)
+        
+        # Phase 2: Deep Analysis
+        phase2_results = self.analyze_batch_phase2(email, phase1_results, text)
+        
+        # Phase 3: Final Enrichment
+        phase3_results = self.analyze_batch_phase3(email, phase1_results, phase2_results)
+        
+        # Combine all results
+        total_time = time.perf_counter() - email_start_time
+        # A missing or null id gets a fresh one, so such emails never share
+        # the analysis id derived from str(None)
+        email_id = email.get('id') or str(uuid.uuid4())
+        
+        return {
+            'id': str(uuid.uuid5(ANALYSIS_ID_NAMESPACE, str(email_id))),
+            'email_id': email_id,
+            **phase1_results,
+            **phase2_results,
+            **phase3_results,
+            'total_processing_time': round(total_time, 3),
+            'created_at': timestamp,
+            'updated_at': timestamp
+        }
+
+    def analyze_batch_phase1(self, email: Dict, text: Optional[EmailText] = None) -> Dict:
         """
         Phase 1: Quick Classification
         
         Args:
             email: Email data dictionary
+            text: Precomputed text views of the email (built if omitted)
             
         Returns:
             Dict with quick classification results
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        subject = email.get('subject', '').lower()
-        body = email.get('body', '').lower()
-        full_text = f"{subject} {body}"
+        text = text or _email_text(email)
+        subject = text.subject_lower
+        full_text = text.full_text_lower
         
         # Workflow classification
         workflow_scores = {}
-        for workflow, patterns in self.workflow_patterns.items():
-            score = sum(1 for pattern in patterns if re.search(pattern, full_text, re.I))
+        for workflow, patterns in self._workflow_regexes.items():
+            score = sum(1 for pattern in patterns if pattern.search(full_text))
             if score > 0:
                 workflow_scores[workflow] = score
         
@@ -220,8 +726,8 @@ class ThreePhaseEmailAnalyzer:
         
         # Priority determination
         priority_scores = {}
-        for priority, patterns in self.priority_indicators.items():
-            score = sum(1 for pattern in patterns if re.search(pattern, full_text, re.I))
+        for priority, patterns in self._priority_regexes.items():
+            score = sum(1 for pattern in patterns if pattern.search(full_text))
             if score > 0:
                 priority_scores[priority] = score
         
@@ -229,16 +735,15 @@ class ThreePhaseEmailAnalyzer:
         
         # Intent extraction
         intent_scores = {}
-        for intent, patterns in self.intent_patterns.items():
-            score = sum(1 for pattern in patterns if re.search(pattern, full_text, re.I))
+        for intent, patterns in self._intent_regexes.items():
+            score = sum(1 for pattern in patterns if pattern.search(full_text))
             if score > 0:
                 intent_scores[intent] = score
         
         quick_intent = max(intent_scores.items(), key=lambda x: x[1])[0] if intent_scores else "General Inquiry"
         
         # Urgency assessment
-        urgency_keywords = ["urgent", "asap", "immediate", "critical", "emergency"]
-        quick_urgency = "High" if any(keyword in full_text for keyword in urgency_keywords) else "Normal"
+        quick_urgency = "High" if URGENCY_KEYWORDS.search(full_text) else "Normal"
         
         # Confidence score (based on pattern matches)
         total_matches = sum(workflow_scores.values()) + sum(priority_scores.values()) + sum(intent_scores.values())
@@ -247,12 +752,12 @@ class ThreePhaseEmailAnalyzer:
         # Suggested workflow state
         if "new" in subject or email.get('is_read') is False:
             quick_suggested_state = "NEW"
-        elif any(word in full_text for word in ["resolved", "closed", "completed"]):
+        elif RESOLVED_KEYWORDS.search(full_text):
             quick_suggested_state = "RESOLVED"
         else:
             quick_suggested_state = "IN_PROGRESS"
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         
         return {
             'quick_workflow': quick_workflow,
@@ -265,22 +770,23 @@ class ThreePhaseEmailAnalyzer:
             'quick_processing_time': round(processing_time, 3)
         }
 
-    def analyze_batch_phase2(self, email: Dict, phase1_results: Dict) -> Dict:
+    def analyze_batch_phase2(self, email: Dict, phase1_results: Dict,
+                             text: Optional[EmailText] = None) -> Dict:
         """
         Phase 2: Deep Analysis
         
         Args:
             email: Email data dictionary
             phase1_results: Results from Phase 1
+            text: Precomputed text views of the email (built if omitted)
             
         Returns:
             Dict with deep analysis results
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        subject = email.get('subject', '')
-        body = email.get('body', '')
-        full_text = f"{subject} {body}"
+        text = text or _email_text(email)
+        full_text = text.full_text
         
         # Extract entities
         entities = self._extract_entities(full_text)
@@ -289,7 +795,7 @@ class ThreePhaseEmailAnalyzer:
         action_items = self._extract_action_items(full_text, phase1_results['quick_priority'])
         
         # Determine workflow state
-        workflow_state = self._determine_workflow_state(email, phase1_results, entities)
+        workflow_state = self._determine_workflow_state(email, phase1_results, entities, text)
         
         # Assess business impact
         business_impact = self._assess_business_impact(phase1_results, entities, action_items)
@@ -312,25 +818,25 @@ class ThreePhaseEmailAnalyzer:
         entity_count = sum(len(v) for v in entities.values() if isinstance(v, list))
         deep_confidence = min(0.95, phase1_results['quick_confidence'] + (entity_count * 0.02))
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         
         return {
             'deep_workflow_primary': deep_workflow_primary,
             'deep_workflow_secondary': deep_workflow_secondary,
-            'deep_workflow_related': json.dumps(deep_workflow_related),
+            'deep_workflow_related': _dumps_list(deep_workflow_related),
             'deep_confidence': round(deep_confidence, 2),
-            'entities_po_numbers': json.dumps(entities['po_numbers']),
-            'entities_quote_numbers': json.dumps(entities['quote_numbers']),
-            'entities_case_numbers': json.dumps(entities['case_numbers']),
-            'entities_part_numbers': json.dumps(entities['part_numbers']),
-            'entities_order_references': json.dumps(entities['order_references']),
-            'entities_contacts': json.dumps(entities['contacts']),
-            'action_items': json.dumps(action_items),
+            'entities_po_numbers': _dumps_list(entities['po_numbers']),
+            'entities_quote_numbers': _dumps_list(entities['quote_numbers']),
+            'entities_case_numbers': _dumps_list(entities['case_numbers']),
+            'entities_part_numbers': _dumps_list(entities['part_numbers']),
+            'entities_order_references': _dumps_list(entities['order_references']),
+            'entities_contacts': _dumps_list(entities['contacts']),
+            'action_items': _dumps_list(action_items),
             'workflow_state': workflow_state,
             'business_impact': business_impact,
             'contextual_summary': contextual_summary,
             'suggested_response': suggested_response,
-            'related_emails': json.dumps(related_emails),
+            'related_emails': _dumps_list(related_emails),
             'deep_processing_time': round(processing_time, 3)
         }
 
@@ -372,64 +878,16 @@ class ThreePhaseEmailAnalyzer:
             'contacts': []
         }
         
-        # PO Numbers (various formats)
-        po_patterns = [
-            r'PO\s*#?\s*(\d{4,})',
-            r'Purchase\s*Order\s*#?\s*(\d{4,})',
-            r'P\.O\.\s*(\d{4,})'
-        ]
-        for pattern in po_patterns:
-            matches = re.findall(pattern, text, re.I)
-            entities['po_numbers'].extend(matches)
-        
-        # Quote Numbers
-        quote_patterns = [
-            r'Quote\s*#?\s*(\d{4,})',
-            r'Quotation\s*#?\s*(\d{4,})',
-            r'RFQ\s*#?\s*(\d{4,})'
-        ]
-        for pattern in quote_patterns:
-            matches = re.findall(pattern, text, re.I)
-            entities['quote_numbers'].extend(matches)
-        
-        # Case Numbers
-        case_patterns = [
-            r'Case\s*#?\s*(\d{4,})',
-            r'Ticket\s*#?\s*(\d{4,})',
-            r'SR\s*#?\s*(\d{4,})'
-        ]
-        for pattern in case_patterns:
-            matches = re.findall(pattern, text, re.I)
-            entities['case_numbers'].extend(matches)
-        
-        # Part Numbers (alphanumeric)
-        part_patterns = [
-            r'Part\s*#?\s*([A-Z0-9]{4,})',
-            r'SKU\s*:?\s*([A-Z0-9]{4,})',
-            r'Item\s*#?\s*([A-Z0-9]{4,})'
-        ]
-        for pattern in part_patterns:
-            matches = re.findall(pattern, text, re.I)
-            entities['part_numbers'].extend(matches)
-        
-        # Order References
-        order_patterns = [
-            r'Order\s*#?\s*(\d{4,})',
-            r'Ref\s*#?\s*(\d{4,})',
-            r'Reference\s*:?\s*(\d{4,})'
-        ]
-        for pattern in order_patterns:
-            matches = re.findall(pattern, text, re.I)
-            entities['order_references'].extend(matches)
+        for key, patterns in ENTITY_PATTERNS.items():
+            for pattern in patterns:
+                entities[key].extend(pattern.findall(text))
         
         # Email addresses as contacts
-        email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-        emails = re.findall(email_pattern, text)
+        emails = EMAIL_ADDRESS_PATTERN.findall(text)
         entities['contacts'].extend([{'email': email, 'type': 'email'} for email in emails])
         
         # Phone numbers as contacts
-        phone_pattern = r'(?:\+?1[-.]?)?\(?(\d{3})\)?[-.]?(\d{3})[-.]?(\d{4})'
-        phones = re.findall(phone_pattern, text)
+        phones = PHONE_PATTERN.findall(text)
         for phone in phones:
             phone_str = ''.join(phone)
             entities['contacts'].append({'phone': phone_str, 'type': 'phone'})
@@ -441,13 +899,13 @@ class ThreePhaseEmailAnalyzer:
                 seen = set()
                 unique_contacts = []
                 for contact in entities[key]:
-                    contact_str = json.dumps(contact, sort_keys=True)
-                    if contact_str not in seen:
-                        seen.add(contact_str)
+                    contact_key = tuple(sorted(contact.items()))
+                    if contact_key not in seen:
+                        seen.add(contact_key)
                         unique_contacts.append(contact)
                 entities[key] = unique_contacts
             else:
-                entities[key] = list(set(entities[key]))
+                entities[key] = list(dict.fromkeys(entities[key]))
         
         return entities
 
@@ -455,31 +913,14 @@ class ThreePhaseEmailAnalyzer:
         """Extract action items from email text."""
         action_items = []
         
-        # Action patterns
-        action_patterns = [
-            r'please\s+(.+?)(?:\.|$)',
-            r'need\s+(?:you\s+)?to\s+(.+?)(?:\.|$)',
-            r'could\s+you\s+(.+?)(?:\.|$)',
-            r'can\s+you\s+(.+?)(?:\.|$)',
-            r'(?:we|I)\s+need\s+(.+?)(?:\.|$)',
-            r'action\s*required\s*:?\s*(.+?)(?:\.|$)'
-        ]
+        # Determine SLA based on priority
+        sla = PRIORITY_SLA.get(priority, DEFAULT_SLA)
         
-        for pattern in action_patterns:
-            matches = re.findall(pattern, text, re.I | re.MULTILINE)
+        for pattern in ACTION_PATTERNS:
+            matches = pattern.findall(text)
             for match in matches:
                 action = match.strip()
                 if len(action) > 10 and len(action) < 200:  # Reasonable length
-                    # Determine SLA based on priority
-                    if priority == "Critical":
-                        sla = "4 hours"
-                    elif priority == "High":
-                        sla = "1 business day"
-                    elif priority == "Medium":
-                        sla = "3 business days"
-                    else:
-                        sla = "5 business days"
-                    
                     action_items.append({
                         'action': action,
                         'priority': priority,
@@ -489,21 +930,21 @@ class ThreePhaseEmailAnalyzer:
         # Limit to top 5 action items
         return action_items[:5]
 
-    def _determine_workflow_state(self, email: Dict, phase1_results: Dict, entities: Dict) -> str:
+    def _determine_workflow_state(self, email: Dict, phase1_results: Dict, entities: Dict,
+                                  email_text: EmailText) -> str:
         """Determine the workflow state based on email content and entities."""
-        subject = email.get('subject', '').lower()
-        body = email.get('body', '').lower()
+        text = email_text.subject_lower + email_text.body_lower
         
         # Check for resolution indicators
-        if any(word in subject + body for word in ['resolved', 'closed', 'completed', 'done']):
+        if RESOLUTION_STATE_KEYWORDS.search(text):
             return "RESOLVED"
         
         # Check for escalation
-        if phase1_results['quick_priority'] == "Critical" or 'escalate' in subject + body:
+        if phase1_results['quick_priority'] == "Critical" or 'escalate' in text:
             return "ESCALATED"
         
         # Check for pending indicators
-        if any(word in subject + body for word in ['waiting', 'pending', 'hold']):
+        if PENDING_STATE_KEYWORDS.search(text):
             return "PENDING_RESPONSE"
         
         # Check if it's a new email
@@ -588,9 +1029,9 @@ class ThreePhaseEmailAnalyzer:
         """Find a secondary workflow that might be relevant."""
         workflow_scores = {}
         
-        for workflow, patterns in self.workflow_patterns.items():
+        for workflow, patterns in self._workflow_regexes.items():
             if workflow != primary_workflow:  # Skip the primary workflow
-                score = sum(1 for pattern in patterns if re.search(pattern, text, re.I))
+                score = sum(1 for pattern in patterns if pattern.search(text))
                 if score > 0:
                     workflow_scores[workflow] = score
         
@@ -614,14 +1055,14 @@ class ThreePhaseEmailAnalyzer:
         
         # Check entity extraction success
         entities_found = any(
-            phase2_results.get(f'entities_{entity}') != '[]'
+            phase2_results.get(f'entities_{entity}') != EMPTY_JSON_LIST
             for entity in ['po_numbers', 'quote_numbers', 'case_numbers', 'part_numbers']
         )
         if entities_found:
             score += 0.2
         
         # Check for action items
-        if phase2_results.get('action_items') != '[]':
+        if phase2_results.get('action_items') != EMPTY_JSON_LIST:
             score += 0.1
         
         # Check for meaningful summary
@@ -672,31 +1113,19 @@ class ThreePhaseEmailAnalyzer:
         Returns:
             bool: True if successful, False otherwise
         """
+        with self._write_lock:
+            return self._insert_analysis_rows(analysis_results)
+
+    def _insert_analysis_rows(self, analysis_results: List[Dict]) -> bool:
+        """Insert analysis rows on the write connection; caller holds _write_lock."""
         try:
-            conn = sqlite3.connect(self.crewai_db_path)
+            conn = self._writer()
+            self._ensure_indexes(conn)
             cursor = conn.cursor()
             
-            # Insert query for email_analysis table
-            insert_query = """
-            INSERT INTO email_analysis (
-                id, email_id, 
-                quick_workflow, quick_priority, quick_intent, quick_urgency, 
-                quick_confidence, quick_suggested_state, quick_model, quick_processing_time,
-                deep_workflow_primary, deep_workflow_secondary, deep_workflow_related, deep_confidence,
-                entities_po_numbers, entities_quote_numbers, entities_case_numbers, 
-                entities_part_numbers, entities_order_references, entities_contacts,
-                action_items, workflow_state, business_impact, contextual_summary, 
-                suggested_response, related_emails,
-                deep_processing_time, total_processing_time,
-                quality_score, final_confidence, needs_review,
-                created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            # Prepare data for insertion
-            insert_data = []
-            for result in analysis_results:
-                data_tuple = (
+            # Stream parameter tuples straight into executemany
+            insert_data = (
+                (
                     result['id'],
                     result['email_id'],
                     result['quick_workflow'],
@@ -731,23 +1160,42 @@ class ThreePhaseEmailAnalyzer:
                     result['created_at'],
                     result['updated_at']
                 )
-                insert_data.append(data_tuple)
+                for result in analysis_results
+            )
             
-            # Execute batch insert
-            cursor.executemany(insert_query, insert_data)
+            # Execute batch insert; rows whose id already exists are skipped
+            changes_before = conn.total_changes
+            cursor.executemany(INSERT_ANALYSIS_SQL, insert_data)
             conn.commit()
+            inserted = conn.total_changes - changes_before
             
-            logger.info(f"Successfully saved {len(analysis_results)} analysis results to database")
+            skipped = len(analysis_results) - inserted
+            if skipped:
+                logger.info(f"Skipped {skipped} analysis results that already existed")
+            logger.info(f"Successfully saved {inserted} analysis results to database")
             return True
             
         except Exception as e:
             logger.error(f"Error saving to database: {e}", exc_info=True)
-            if conn:
-                conn.rollback()
+            if self._write_conn:
+                self._write_conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
+
+
+# Per-process analyzer used by pool workers, built once in _init_worker
+_worker_analyzer: Optional[ThreePhaseEmailAnalyzer] = None
+
+
+def _init_worker() -> None:
+    """Build the analyzer (and its compiled patterns) once per worker process."""
+    global _worker_analyzer
+    _worker_analyzer = ThreePhaseEmailAnalyzer(workers=1)
+
+
+def _analyze_chunk(task: Tuple[List[Dict], str]) -> List[Dict]:
+    """Analyze one chunk of emails inside a pool worker."""
+    emails, timestamp = task
+    return [_worker_analyzer.analyze_email(email, timestamp) for email in emails]
 
 
 def main():
@@ -763,10 +1211,10 @@ def main():
     
     logger.info(f"Found {len(batch_files)} batch files to process")
     
-    success_count = 0
-    for batch_file in batch_files:
-        if analyzer.process_batch_file(str(batch_file)):
-            success_count += 1
+    try:
+        success_count = analyzer.process_batch_files([str(batch_file) for batch_file in batch_files])
+    finally:
+        analyzer.close()
     
     logger.info(f"Processing complete. Successfully processed {success_count}/{len(batch_files)} batches")
 